@@ -1,40 +1,430 @@
-from flask import Flask, render_template, request
+from flask import Flask, Response, g, jsonify, render_template, request, stream_template
 import os
+import io
+import zipfile
+import zlib
+from itertools import islice
 from PyPDF2 import PdfReader
-import spacy
-import google.generativeai as genai
 from dotenv import load_dotenv
+import numpy as np
 import json
 import re
 import logging
+import gc
+import hashlib
+import sqlite3
+import threading
+import time
+import queue
+import uuid
+from collections import OrderedDict, defaultdict, namedtuple
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 
 app = Flask(__name__)
 
-# Setup logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
-
 # Load environment variables
 load_dotenv()
 gemini_api_key = os.getenv('GEMINI_API_KEY')
 
-# Configure upload folder
-UPLOAD_FOLDER = 'uploads'
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Setup logging
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), format='%(asctime)s - %(levelname)s - %(message)s')
+
+class Counter:
+    """Monotonic counter per label set, rendered in Prometheus text format."""
+
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{{{format_labels(self.labels, label_values)}}} {value}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, rendered in Prometheus text format."""
+
+    def __init__(self, name, help_text, labels,
+                 buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.setdefault(label_values, {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                labels = format_labels(self.labels, label_values)
+                count, total = series['count'], series['sum']
+                for bound, bucket_count in zip(self.buckets, series['buckets']):
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {bucket_count}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f"{self.name}_sum{{{labels}}} {total}")
+                lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+def format_labels(names, values):
+    return ','.join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values))
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+# Metrics are per process; scrape each worker (or run one worker) for complete numbers
+STAGE_SECONDS = Histogram('resume_analyzer_stage_duration_seconds', 'Time spent in each pipeline stage.', ['stage'])
+REQUEST_SECONDS = Histogram('resume_analyzer_request_duration_seconds', 'Time to build each response.', ['endpoint'])
+REQUESTS = Counter('resume_analyzer_requests_total', 'Responses by endpoint and status code.', ['endpoint', 'status'])
+STAGE_FALLBACKS = Counter('resume_analyzer_stage_fallbacks_total', 'LLM stages that timed out or failed.', ['stage', 'reason'])
+# Benchmarks append callables taking (stage, seconds) to collect raw samples
+STAGE_LISTENERS = []
+
+@contextmanager
+def stage_timer(stage):
+    """Record how long the enclosed block takes as one observation of the given stage."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+def record_stage(stage, elapsed):
+    STAGE_SECONDS.observe(elapsed, stage)
+    for listener in STAGE_LISTENERS:
+        listener(stage, elapsed)
+
+def timed(stage, fn):
+    def run(*args):
+        with stage_timer(stage):
+            return fn(*args)
+    return run
+
+# SpaCy settings; keyword extraction only needs POS tags and entities, so the
+# parser and lemmatizer are excluded and the model loads on first use
+SPACY_MODEL = os.getenv('SPACY_MODEL', 'en_core_web_sm')
+SPACY_EXCLUDE = [name.strip() for name in os.getenv('SPACY_EXCLUDE', 'parser,lemmatizer').split(',') if name.strip()]
+NLP_PRELOAD = os.getenv('NLP_PRELOAD', '0') == '1'
+_nlp = None
+_nlp_lock = threading.Lock()
+
+def get_nlp():
+    """Load the trimmed SpaCy pipeline once per process."""
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                import spacy
+                started = time.perf_counter()
+                _nlp = spacy.load(SPACY_MODEL, exclude=SPACY_EXCLUDE)
+                logging.info(f"Loaded SpaCy {SPACY_MODEL} {_nlp.pipe_names} in {time.perf_counter() - started:.2f}s")
+    return _nlp
+
+if NLP_PRELOAD:
+    # With gunicorn --preload the model is loaded in the master and shared copy-on-write;
+    # freezing keeps the collector from touching (and so copying) those pages in workers
+    get_nlp()
+    gc.freeze()
+
+# LLM backend and response cache settings
+GEMINI_MODEL_NAME = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')
+GEMINI_BACKEND = os.getenv('GEMINI_BACKEND', 'gemini')
+LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', os.path.join('cache', 'llm_cache.sqlite3'))
+LLM_CACHE_SIZE = int(os.getenv('LLM_CACHE_SIZE', '256'))
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', str(7 * 24 * 3600)))
+
+# Domains Gemini may answer with; anything else (or a failed call) falls back to DEFAULT_DOMAIN
+JOB_DOMAINS = ('tech', 'finance', 'healthcare', 'general')
+DEFAULT_DOMAIN = 'general'
+
+CachedResponse = namedtuple('CachedResponse', ['text'])
+
+class TextCache:
+    """Two-tier (in-process LRU + shared SQLite) cache mapping content hashes to text."""
+
+    def __init__(self, path=LLM_CACHE_PATH, max_size=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL, table='llm_cache'):
+        self.path = path
+        self.table = table
+        self.max_size = max_size
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with self._connect() as conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute(f'CREATE TABLE IF NOT EXISTS {self.table} '
+                             '(key TEXT PRIMARY KEY, text TEXT NOT NULL, created_at REAL NOT NULL)')
+
+    @staticmethod
+    def make_key(model_name, prompt, generation_config=None):
+        """Hash the model name, whitespace-normalized prompt and any generation config."""
+        normalized = ' '.join(prompt.split())
+        config = json.dumps(generation_config, sort_keys=True) if generation_config else ''
+        return hashlib.sha256(f"{model_name}\0{normalized}\0{config}".encode('utf-8')).hexdigest()
+
+    def _connect(self):
+        # A connection per operation keeps the store safe across threads and forked workers
+        return sqlite3.connect(self.path, timeout=5)
 
-# Load SpaCy model for keyword extraction
-nlp = spacy.load('en_core_web_sm')
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return entry[0]
+            self._memory.pop(key, None)
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(f'SELECT text, created_at FROM {self.table} WHERE key = ?', (key,)).fetchone()
+            except sqlite3.Error as e:
+                logging.error(f"LLM cache read error: {str(e)}")
+                row = None
+            if row and now - row[1] < self.ttl:
+                self._remember(key, row[0], row[1])
+                with self._lock:
+                    self.stats['disk_hits'] += 1
+                return row[0]
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def set(self, key, text):
+        created_at = time.time()
+        self._remember(key, text, created_at)
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(f'INSERT OR REPLACE INTO {self.table} (key, text, created_at) VALUES (?, ?, ?)',
+                                 (key, text, created_at))
+                    conn.execute(f'DELETE FROM {self.table} WHERE created_at < ?', (created_at - self.ttl,))
+            except sqlite3.Error as e:
+                logging.error(f"LLM cache write error: {str(e)}")
+
+    def _remember(self, key, text, created_at):
+        with self._lock:
+            self._memory[key] = (text, created_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+class CachedModel:
+    """Wrap a model backend so identical prompts are answered from the cache.
+
+    Callers may pass validate, a callable that raises or returns a falsy value for an answer
+    they cannot use; such answers are returned but never cached, and a cached answer that
+    fails it is fetched again, so a malformed reply is retried on the next request.
+    """
+
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+        self.model_name = backend.model_name
+
+    def generate_content(self, prompt, stream=False, validate=None, **kwargs):
+        key = self.cache.make_key(self.model_name, prompt, kwargs.get('generation_config'))
+        text = self.cache.get(key)
+        if text is not None and not self._usable(validate, text):
+            text = None
+        if stream:
+            if text is not None:
+                return iter([CachedResponse(text)])
+            return self._stream_and_store(key, self.backend.generate_content(prompt, stream=True, **kwargs), validate)
+        if text is None:
+            text = self.backend.generate_content(prompt, **kwargs).text
+            if self._usable(validate, text):
+                self.cache.set(key, text)
+        return CachedResponse(text)
+
+    def _stream_and_store(self, key, chunks, validate=None):
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk.text)
+            yield CachedResponse(chunk.text)
+        text = ''.join(parts)
+        if self._usable(validate, text):
+            self.cache.set(key, text)
+
+    @staticmethod
+    def _usable(validate, text):
+        if validate is None:
+            return True
+        try:
+            return bool(validate(text))
+        except Exception:
+            return False
+
+class FakeModel:
+    """Offline stand-in for Gemini returning deterministic answers in the expected formats."""
+
+    domain_terms = {
+        'tech': ('software', 'python', 'developer', 'engineer', 'cloud', 'data'),
+        'finance': ('finance', 'financial', 'accounting', 'investment', 'bank'),
+        'healthcare': ('patient', 'clinical', 'nurse', 'hospital', 'medical'),
+    }
+
+    def __init__(self, model_name='fake', latency=0.0):
+        self.model_name = model_name
+        self.latency = latency
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False, request_options=None, **kwargs):
+        self.calls += 1
+        timeout = (request_options or {}).get('timeout')
+        if stream:
+            return self._stream(self._answer(prompt), timeout)
+        if timeout is not None and self.latency > timeout:
+            # Behave like the Gemini client giving up on a slow call
+            time.sleep(timeout)
+            raise TimeoutError(f'Fake Gemini call exceeded {timeout}s timeout')
+        if self.latency:
+            time.sleep(self.latency)
+        return CachedResponse(self._answer(prompt))
+
+    def _stream(self, text, timeout=None):
+        # Spread the latency over line-sized chunks, as a streamed response would arrive
+        lines = text.splitlines(keepends=True)
+        started = time.monotonic()
+        for line in lines:
+            if self.latency:
+                time.sleep(self.latency / len(lines))
+            if timeout is not None and time.monotonic() - started > timeout:
+                raise TimeoutError(f'Fake Gemini stream exceeded {timeout}s timeout')
+            yield CachedResponse(line)
+
+    def _answer(self, prompt):
+        lowered = prompt.lower()
+        job_text = lowered.split('job description:')[-1]
+        domain = next((name for name, terms in self.domain_terms.items() if any(term in job_text for term in terms)),
+                      DEFAULT_DOMAIN)
+        if 'you are a resume parser' in lowered:
+            skills = [term for terms in self.domain_terms.values() for term in terms if term in lowered]
+            data = {'name': 'Test Candidate', 'skills': skills}
+            if 'industry domain' in lowered:
+                data['domain'] = domain
+            return json.dumps(data)
+        if 'identify the industry domain' in lowered:
+            return domain
+        return (
+            "### Areas of Improvement Summary\n"
+            "The resume covers the basics but misses several keywords from the posting.\n"
+            "### Strengths\n- Relevant experience is listed.\n"
+            "### Weaknesses\n- Several job keywords are missing.\n"
+            "### Suggestions for Improvement\n- Add the missing keywords where they apply.\n"
+            "### SWOT Analysis\n"
+            "**Strengths:** Relevant experience\n**Weaknesses:** Keyword gaps\n"
+            "**Opportunities:** Tailor the resume\n**Threats:** ATS filtering"
+        )
+
+def create_model_backend(backend=GEMINI_BACKEND, model_name=GEMINI_MODEL_NAME):
+    """Build the configured model backend ('gemini' or 'fake')."""
+    if backend == 'fake':
+        return FakeModel(f"fake/{model_name}", float(os.getenv('FAKE_GEMINI_LATENCY', '0')))
+    if backend == 'gemini':
+        import google.generativeai as genai
+        genai.configure(api_key=gemini_api_key)
+        return genai.GenerativeModel(model_name)
+    raise ValueError(f"Unknown GEMINI_BACKEND: {backend}")
 
 # Initialize Gemini API
-genai.configure(api_key=gemini_api_key)
-model = genai.GenerativeModel('gemini-1.5-flash')
+llm_cache = TextCache()
+model = CachedModel(create_model_backend(), llm_cache)
+
+# LLM stages run on a shared thread pool, each bounded by its own deadline (seconds)
+LLM_CONCURRENT = os.getenv('LLM_CONCURRENT', '1') == '1'
+LLM_WORKERS = int(os.getenv('LLM_WORKERS', '8'))
+STAGE_TIMEOUTS = {
+    'domain': float(os.getenv('DOMAIN_TIMEOUT', '10')),
+    'details': float(os.getenv('DETAILS_TIMEOUT', '15')),
+    'suggestions': float(os.getenv('SUGGESTIONS_TIMEOUT', '30')),
+    'combined': float(os.getenv('COMBINED_TIMEOUT', '15')),
+}
+# GEMINI_COMBINED_CALL asks for name, skills and domain in one structured request;
+# GEMINI_STREAM_SUGGESTIONS streams the analysis into the results page as it arrives
+GEMINI_COMBINED_CALL = os.getenv('GEMINI_COMBINED_CALL', '0') == '1'
+GEMINI_STREAM_SUGGESTIONS = os.getenv('GEMINI_STREAM_SUGGESTIONS', '0') == '1'
+COMBINED_GENERATION_CONFIG = {
+    'response_mime_type': 'application/json',
+    'response_schema': {
+        'type': 'OBJECT',
+        'properties': {
+            'name': {'type': 'STRING', 'nullable': True},
+            'skills': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+            'domain': {'type': 'STRING'}
+        },
+        'required': ['name', 'skills', 'domain']
+    }
+}
+llm_executor = ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix='llm')
+
+def stage_request_options(stage):
+    """Gemini request options that end a call at its stage deadline, so late calls free their thread."""
+    return {'timeout': STAGE_TIMEOUTS[stage]}
+
+def submit_stage(stage, fn, *args):
+    """Start an LLM stage on the thread pool (or inline when concurrency is off)."""
+    fn = timed(f'gemini_{stage}', fn)
+    deadline = time.monotonic() + STAGE_TIMEOUTS[stage]
+    if LLM_CONCURRENT:
+        future = llm_executor.submit(fn, *args)
+    else:
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+    future.stage = stage
+    future.deadline = deadline
+    return future
+
+def await_stage(future, fallback):
+    """Wait for a stage until its deadline, returning fallback() if it is late or fails."""
+    try:
+        return future.result(timeout=max(0, future.deadline - time.monotonic()))
+    except FutureTimeoutError:
+        logging.warning(f"Stage '{future.stage}' missed its {STAGE_TIMEOUTS[future.stage]}s deadline")
+        STAGE_FALLBACKS.inc(future.stage, 'timeout')
+        future.cancel()
+    except Exception as e:
+        logging.error(f"Stage '{future.stage}' error: {str(e)}")
+        STAGE_FALLBACKS.inc(future.stage, 'error')
+    return fallback()
 
 def extract_keywords(text):
     """Extract alphanumeric keywords (nouns, proper nouns, entities) from text."""
-    doc = nlp(text)
-    keywords = {token.text.lower() for token in doc 
-                if (token.pos_ in ('NOUN', 'PROPN') or token.ent_type_) and token.text.isalnum()}
-    return keywords
+    return doc_keywords(get_nlp()(text))
+
+def extract_keywords_batch(texts, batch_size=16):
+    """Extract keywords for many texts through a single nlp.pipe stream."""
+    return [doc_keywords(doc) for doc in get_nlp().pipe(texts, batch_size=batch_size)]
+
+def doc_keywords(doc):
+    return {token.text.lower() for token in doc
+            if (token.pos_ in ('NOUN', 'PROPN') or token.ent_type_) and token.text.isalnum()}
 
 def extract_resume_details(resume_text):
     """Extract name and skills using Gemini, phone and email with regex fallback."""
@@ -53,8 +443,9 @@ def extract_resume_details(resume_text):
     '{resume_text[:2000]}'
     """
     try:
-        response = model.generate_content(prompt)
-        data = json.loads(response.text.strip().replace('```json', '').replace('```', ''))
+        response = model.generate_content(prompt, request_options=stage_request_options('details'),
+                                          validate=parse_json_answer)
+        data = parse_json_answer(response.text)
         details = {
             'name': data.get('name'),
             'phone': None,
@@ -63,8 +454,13 @@ def extract_resume_details(resume_text):
         }
     except Exception as e:
         logging.error(f"Gemini details error: {str(e)}")
-        details = {'name': None, 'phone': None, 'email': None, 'skills': []}
-    
+        details = None
+    return extract_contact_details(resume_text, details)
+
+def extract_contact_details(resume_text, details=None):
+    """Fill phone and email via regex; also the fallback when Gemini details are unavailable."""
+    details = details or {'name': None, 'phone': None, 'email': None, 'skills': []}
+
     # Extract phone and email with regex
     phone_pattern = r'\b(\+?\d{1,3}[-.]?)?\(?\d{3}\)?[-.]?\d{3}[-.]?\d{4}\b'
     if phone_match := re.search(phone_pattern, resume_text):
@@ -78,36 +474,161 @@ def extract_resume_details(resume_text):
     details['skills'] = list(set(skill.lower() for skill in details['skills'] if skill))
     return details
 
+def extract_details_and_domain(resume_text, job_description):
+    """Extract name, skills and the job domain in one Gemini call with a JSON response schema."""
+    prompt = f"""
+    You are a resume parser. From the resume text, extract:
+    - Candidate's name (plausible human name, not terms like 'Machine Learning')
+    - Skills (technical/relevant skills, e.g., Python, SQL)
+    Also identify the industry domain of the job description: one of tech, finance, healthcare, general.
+    Resume text:
+    '{resume_text[:2000]}'
+    Job description:
+    '{job_description[:1000]}'
+    """
+    try:
+        response = model.generate_content(prompt, generation_config=COMBINED_GENERATION_CONFIG,
+                                          request_options=stage_request_options('combined'),
+                                          validate=lambda text: parse_domain(parse_json_answer(text).get('domain')))
+        data = parse_json_answer(response.text)
+        details = {
+            'name': data.get('name'),
+            'phone': None,
+            'email': None,
+            'skills': data.get('skills', [])
+        }
+        domain = parse_domain(data.get('domain')) or default_domain()
+    except Exception as e:
+        logging.error(f"Gemini combined details error: {str(e)}")
+        details, domain = None, default_domain()
+    return extract_contact_details(resume_text, details), domain
+
 def detect_job_domain(job_description):
     """Detect job domain using Gemini."""
+    try:
+        return query_job_domain(job_description)
+    except Exception as e:
+        logging.error(f"Gemini domain error: {str(e)}")
+        return default_domain()
+
+def query_job_domain(job_description):
+    """Ask Gemini for the job domain, letting API errors propagate to the caller."""
     prompt = f"""
     Identify the industry domain (tech, finance, healthcare, general) from the job description.
     Return a single word.
     Job description:
     '{job_description[:1000]}'
     """
-    try:
-        response = model.generate_content(prompt)
-        domain = response.text.strip().lower()
-        return domain if domain in ['tech', 'finance', 'healthcare', 'general'] else 'general'
-    except Exception as e:
-        logging.error(f"Gemini domain error: {str(e)}")
-        return 'general'
+    response = model.generate_content(prompt, request_options=stage_request_options('domain'), validate=parse_domain)
+    return parse_domain(response.text) or default_domain()
+
+def default_domain():
+    return DEFAULT_DOMAIN
+
+def parse_domain(text):
+    """Normalise a Gemini domain answer; None unless it is one of JOB_DOMAINS."""
+    domain = str(text or '').strip().lower()
+    return domain if domain in JOB_DOMAINS else None
+
+def parse_json_answer(text):
+    """Parse the JSON object in a Gemini answer, tolerating ```json fences."""
+    data = json.loads(text.strip().replace('```json', '').replace('```', ''))
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a JSON object, got {type(data).__name__}")
+    return data
 
 def calculate_resume_score(resume_text, matched_keywords, job_keywords):
     """Calculate resume score based on keyword match, length, and formatting."""
     keyword_score = (len(matched_keywords) / len(job_keywords) * 50) if job_keywords else 0
+    return max(0, min(round(keyword_score + structure_score(resume_text)), 100))
 
+def structure_score(resume_text):
+    """Length and formatting components of the resume score (0-50), independent of the job."""
     word_count = len(resume_text.split())
     length_score = 30 if 500 <= word_count <= 1000 else 20 if 300 <= word_count < 500 or 1000 < word_count <= 1500 else 10
 
     formatting_score = sum(6.67 for section in ['skills', 'experience', 'education'] if section in resume_text.lower())
     formatting_score = min(formatting_score, 20)
 
-    return max(0, min(round(keyword_score + length_score + formatting_score), 100))
+    return length_score + formatting_score
+
+class TfidfScorer:
+    """Score N resumes against M jobs at once, weighting each keyword by its IDF over the corpus.
+
+    Keyword sets from extract_keywords are mapped onto a shared vocabulary. Resumes are
+    held as CSR index arrays (binary term presence) and jobs as a dense M x V matrix of
+    IDF weights, so the matched weight for every pair is one vectorized product. The
+    keyword component is the share of a job's total IDF weight the resume covers (0-50);
+    structure_score adds the length and formatting components as in calculate_resume_score.
+    """
+
+    def __init__(self):
+        self.vocabulary = {}
+        self.idf = np.zeros(0)
+
+    def fit(self, keyword_sets):
+        """Learn the vocabulary and smoothed IDF weights from a corpus of keyword sets."""
+        keyword_sets = list(keyword_sets)
+        self.vocabulary = {term: i for i, term in enumerate(sorted(set().union(*keyword_sets)))}
+        indptr, indices = self.transform(keyword_sets)
+        doc_freq = np.bincount(indices, minlength=len(self.vocabulary))
+        self.idf = np.log((1 + len(keyword_sets)) / (1 + doc_freq)) + 1
+        return self
+
+    def transform(self, keyword_sets):
+        """Return CSR (indptr, indices) arrays for keyword sets; terms outside the vocabulary are dropped."""
+        rows = [[self.vocabulary[term] for term in keywords if term in self.vocabulary] for keywords in keyword_sets]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in rows], out=indptr[1:])
+        indices = np.fromiter((i for row in rows for i in row), dtype=np.int64, count=indptr[-1])
+        return indptr, indices
+
+    def job_weights(self, job_keyword_sets):
+        """Dense M x V matrix holding each job keyword's IDF weight."""
+        indptr, indices = self.transform(job_keyword_sets)
+        weights = np.zeros((len(indptr) - 1, len(self.vocabulary)))
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        weights[rows, indices] = self.idf[indices]
+        return weights
+
+    def keyword_scores(self, resume_keyword_sets, job_keyword_sets):
+        """N x M matrix of IDF-weighted keyword coverage scaled to 0-50."""
+        indptr, indices = self.transform(resume_keyword_sets)
+        weights = self.job_weights(job_keyword_sets)
+        # Row sums of the CSR x dense product via prefix sums over each resume's column slice
+        prefix = np.zeros((weights.shape[0], len(indices) + 1))
+        np.cumsum(weights[:, indices], axis=1, out=prefix[:, 1:])
+        matched = (prefix[:, indptr[1:]] - prefix[:, indptr[:-1]]).T
+        totals = weights.sum(axis=1)
+        return np.divide(matched * 50, totals, out=np.zeros_like(matched), where=totals > 0)
+
+    def score_matrix(self, resume_keyword_sets, job_keyword_sets, structure_scores):
+        """N x M matrix of 0-100 resume scores; structure_scores holds structure_score() per resume."""
+        scores = self.keyword_scores(resume_keyword_sets, job_keyword_sets)
+        scores += np.asarray(structure_scores, dtype=float)[:, None]
+        return np.clip(np.round(scores), 0, 100).astype(int)
 
 def generate_suggestions(missing_keywords, job_description, domain, name):
     """Generate resume analysis using Gemini."""
+    prompt = suggestions_prompt(missing_keywords, job_description, domain, name)
+    try:
+        response = model.generate_content(prompt, request_options=stage_request_options('suggestions'))
+        text = response.text.strip()
+        
+        sections = empty_suggestions()
+        current_section = None
+        for line in text.split('\n'):
+            current_section = parse_suggestion_line(sections, current_section, line)
+        
+        for key in ['summary', 'strengths', 'weaknesses', 'suggestions']:
+            sections[key] = sections[key].strip()
+        
+        return sections
+    except Exception as e:
+        logging.error(f"Gemini API error: {str(e)}")
+        return default_suggestions()
+
+def suggestions_prompt(missing_keywords, job_description, domain, name):
     domain_guidance = {
         'tech': "Highlight GitHub projects, certifications, or technologies (e.g., Python, AWS).",
         'finance': "Emphasize financial modeling, analytical skills, or certifications (e.g., CFA).",
@@ -123,7 +644,7 @@ def generate_suggestions(missing_keywords, job_description, domain, name):
     - Areas of Improvement Summary: 2-3 sentences on key gaps and ATS/recruiter impact.
     - Strengths: 3-5 strengths based on matched keywords or inferred content, with examples.
     - Weaknesses: 3-5 weaknesses based on missing keywords, with explanations.
-    - Suggestions for Improvement: 4-6 actionable, domain-specific suggestions, following: {domain_guidance.get(domain, domain_guidance['general'])}.
+    - Suggestions for Improvement: 4-6 actionable, domain-specific suggestions, following: {domain_guidance.get(domain, domain_guidance[DEFAULT_DOMAIN])}.
     - SWOT Analysis: Detailed Strengths, Weaknesses, Opportunities, Threats, tailored to the job.
     Format as:
     ### Areas of Improvement Summary
@@ -147,56 +668,576 @@ def generate_suggestions(missing_keywords, job_description, domain, name):
     **Threats:** [Threats]
     Be concise, professional, and use bullet points for Strengths, Weaknesses, Suggestions.
     """
-    try:
-        response = model.generate_content(prompt)
-        text = response.text.strip()
-        logging.debug(f"Gemini response: {text}")
-        
-        sections = {
-            'summary': '',
-            'strengths': '',
-            'weaknesses': '',
-            'suggestions': '',
-            'swot': {'strengths': '', 'weaknesses': '', 'opportunities': '', 'threats': ''}
-        }
-        
-        current_section = None
-        for line in text.split('\n'):
-            line = line.strip()
-            if line.startswith('### Areas of Improvement Summary'):
-                current_section = 'summary'
-            elif line.startswith('### Strengths'):
-                current_section = 'strengths'
-            elif line.startswith('### Weaknesses'):
-                current_section = 'weaknesses'
-            elif line.startswith('### Suggestions for Improvement'):
-                current_section = 'suggestions'
-            elif line.startswith('### SWOT Analysis'):
-                current_section = 'swot'
-            elif line.startswith('**Strengths:**'):
-                sections['swot']['strengths'] = line.replace('**Strengths:**', '').strip()
-            elif line.startswith('**Weaknesses:**'):
-                sections['swot']['weaknesses'] = line.replace('**Weaknesses:**', '').strip()
-            elif line.startswith('**Opportunities:**'):
-                sections['swot']['opportunities'] = line.replace('**Opportunities:**', '').strip()
-            elif line.startswith('**Threats:**'):
-                sections['swot']['threats'] = line.replace('**Threats:**', '').strip()
-            elif line and current_section in ['summary', 'strengths', 'weaknesses', 'suggestions']:
-                sections[current_section] += f"\n{line}" if sections[current_section] else line
-        
+    return prompt
+
+def empty_suggestions():
+    return {
+        'summary': '',
+        'strengths': '',
+        'weaknesses': '',
+        'suggestions': '',
+        'swot': {'strengths': '', 'weaknesses': '', 'opportunities': '', 'threats': ''}
+    }
+
+def parse_suggestion_line(sections, current_section, line):
+    """Apply one line of the '###'-sectioned analysis to sections; returns the section now being read."""
+    line = line.strip()
+    if line.startswith('### Areas of Improvement Summary'):
+        current_section = 'summary'
+    elif line.startswith('### Strengths'):
+        current_section = 'strengths'
+    elif line.startswith('### Weaknesses'):
+        current_section = 'weaknesses'
+    elif line.startswith('### Suggestions for Improvement'):
+        current_section = 'suggestions'
+    elif line.startswith('### SWOT Analysis'):
+        current_section = 'swot'
+    elif line.startswith('**Strengths:**'):
+        sections['swot']['strengths'] = line.replace('**Strengths:**', '').strip()
+    elif line.startswith('**Weaknesses:**'):
+        sections['swot']['weaknesses'] = line.replace('**Weaknesses:**', '').strip()
+    elif line.startswith('**Opportunities:**'):
+        sections['swot']['opportunities'] = line.replace('**Opportunities:**', '').strip()
+    elif line.startswith('**Threats:**'):
+        sections['swot']['threats'] = line.replace('**Threats:**', '').strip()
+    elif line and current_section in ['summary', 'strengths', 'weaknesses', 'suggestions']:
+        sections[current_section] += f"\n{line}" if sections[current_section] else line
+    return current_section
+
+class StreamedSuggestions:
+    """Analysis sections parsed incrementally from a streamed Gemini response.
+
+    Reading a section (as result.html does, top to bottom) pulls chunks from the stream
+    until that section is complete, so a streamed template can flush each section to the
+    browser as soon as it has arrived. Sections missing when the stream fails or ends
+    fall back to default_suggestions().
+    """
+
+    order = ['summary', 'strengths', 'weaknesses', 'suggestions', 'swot']
+
+    def __init__(self, missing_keywords, job_description, domain, name):
+        self._sections = empty_suggestions()
+        self._current = None
+        self._buffer = ''
+        self._done = False
+        self._started = time.perf_counter()
+        try:
+            self._chunks = model.generate_content(suggestions_prompt(missing_keywords, job_description, domain, name),
+                                                  stream=True, request_options=stage_request_options('suggestions'))
+        except Exception as e:
+            logging.error(f"Gemini API error: {str(e)}")
+            STAGE_FALLBACKS.inc('suggestions', 'error')
+            self._finish(failed=True)
+
+    def __getattr__(self, name):
+        if name not in self.order:
+            raise AttributeError(name)
+        while not self._done and (self._current not in self.order
+                                  or self.order.index(self._current) <= self.order.index(name)):
+            self._pull()
+        return self._sections[name]
+
+    def _pull(self):
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._finish()
+            return
+        except Exception as e:
+            logging.error(f"Gemini API error: {str(e)}")
+            STAGE_FALLBACKS.inc('suggestions', 'error')
+            self._finish(failed=True)
+            return
+        self._buffer += chunk.text
+        *lines, self._buffer = self._buffer.split('\n')
+        for line in lines:
+            self._current = parse_suggestion_line(self._sections, self._current, line)
+
+    def _finish(self, failed=False):
+        if self._buffer:
+            self._current = parse_suggestion_line(self._sections, self._current, self._buffer)
+            self._buffer = ''
+        fallback = default_suggestions()
         for key in ['summary', 'strengths', 'weaknesses', 'suggestions']:
-            sections[key] = sections[key].strip()
-        
-        return sections
+            self._sections[key] = self._sections[key].strip() or fallback[key]
+        for key, value in self._sections['swot'].items():
+            self._sections['swot'][key] = value or fallback['swot'][key]
+        self._done = True
+        if not failed:
+            record_stage('gemini_suggestions', time.perf_counter() - self._started)
+
+def default_suggestions():
+    return {
+        'summary': 'Unable to generate analysis. Ensure keywords are relevant.',
+        'strengths': 'Unable to identify strengths.',
+        'weaknesses': 'Unable to identify weaknesses.',
+        'suggestions': 'Add missing keywords and quantify achievements.',
+        'swot': {'strengths': 'N/A', 'weaknesses': 'N/A', 'opportunities': 'N/A', 'threats': 'N/A'}
+    }
+
+# PDF ingestion settings; uploads are parsed in memory and never written to disk
+PDF_MAX_BYTES = int(os.getenv('PDF_MAX_BYTES', str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.getenv('PDF_MAX_PAGES', '50'))
+PDF_PARALLEL_PAGES = int(os.getenv('PDF_PARALLEL_PAGES', '16'))
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', str(os.cpu_count() or 2)))
+PDF_TEXT_CACHE_PATH = os.getenv('PDF_TEXT_CACHE_PATH', os.path.join('cache', 'pdf_text.sqlite3'))
+PDF_TEXT_CACHE_TTL = int(os.getenv('PDF_TEXT_CACHE_TTL', str(24 * 3600)))
+pdf_text_cache = TextCache(PDF_TEXT_CACHE_PATH, LLM_CACHE_SIZE, PDF_TEXT_CACHE_TTL, table='pdf_text')
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+# Batch ranking settings
+BATCH_MAX_FILES = int(os.getenv('BATCH_MAX_FILES', '500'))
+BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', '32'))
+BATCH_MAX_BYTES = int(os.getenv('BATCH_MAX_BYTES', str(256 * 1024 * 1024)))
+
+# Refuse oversized request bodies before Werkzeug receives them; the slack covers
+# the job description and multipart headers around a single PDF
+FORM_OVERHEAD_BYTES = 1024 * 1024
+app.config['MAX_CONTENT_LENGTH'] = PDF_MAX_BYTES + FORM_OVERHEAD_BYTES
+
+class PDFLimitError(ValueError):
+    """Raised when an upload exceeds the configured byte or page limits."""
+
+def get_pdf_pool():
+    """Create the PDF extraction process pool on first use, after gunicorn has forked."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+        return _pdf_pool
+
+def run_in_pdf_pool(fn):
+    """Call fn(pool), retrying once on a fresh pool if a child process died and broke the current one."""
+    global _pdf_pool
+    for attempt in range(2):
+        pool = get_pdf_pool()
+        try:
+            return fn(pool)
+        except BrokenProcessPool:
+            logging.warning(f"PDF process pool broke (attempt {attempt + 1}); starting a new one")
+            with _pdf_pool_lock:
+                if _pdf_pool is pool:
+                    _pdf_pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            if attempt:
+                raise
+
+def read_upload(file):
+    """Read an uploaded file into memory, refusing anything over PDF_MAX_BYTES."""
+    data = file.read(PDF_MAX_BYTES + 1)
+    if len(data) > PDF_MAX_BYTES:
+        raise PDFLimitError(f'PDF exceeds {PDF_MAX_BYTES} bytes')
+    return data
+
+def open_pdf(data):
+    reader = PdfReader(io.BytesIO(data))
+    if len(reader.pages) > PDF_MAX_PAGES:
+        raise PDFLimitError(f'PDF exceeds {PDF_MAX_PAGES} pages')
+    return reader
+
+def extract_pdf_pages(data, start, stop):
+    """Extract text from pages [start, stop) of PDF bytes; runs in the process pool."""
+    reader = PdfReader(io.BytesIO(data))
+    return ''.join(reader.pages[i].extract_text() or '' for i in range(start, stop))
+
+def pdf_to_text(data):
+    """Extract text from PDF bytes, splitting large documents by page range across the process pool."""
+    key = hashlib.sha256(data).hexdigest()
+    text = pdf_text_cache.get(key)
+    if text is not None:
+        return text
+    reader = open_pdf(data)
+    page_count = len(reader.pages)
+    if page_count >= PDF_PARALLEL_PAGES and PDF_WORKERS > 1:
+        step = -(-page_count // PDF_WORKERS)
+        def extract(pool):
+            futures = [pool.submit(extract_pdf_pages, data, start, min(start + step, page_count))
+                       for start in range(0, page_count, step)]
+            return ''.join(future.result() for future in futures)
+
+        text = run_in_pdf_pool(extract)
+    else:
+        text = ''.join(page.extract_text() or '' for page in reader.pages)
+    pdf_text_cache.set(key, text)
+    return text
+
+def extract_pdf_text(data):
+    """Extract text from PDF bytes, returning (text, error) so one bad file cannot sink a batch."""
+    try:
+        reader = open_pdf(data)
+        return ''.join(page.extract_text() or '' for page in reader.pages), None
     except Exception as e:
-        logging.error(f"Gemini API error: {str(e)}")
-        return {
-            'summary': 'Unable to generate analysis. Ensure keywords are relevant.',
-            'strengths': 'Unable to identify strengths.',
-            'weaknesses': 'Unable to identify weaknesses.',
-            'suggestions': 'Add missing keywords and quantify achievements.',
-            'swot': {'strengths': 'N/A', 'weaknesses': 'N/A', 'opportunities': 'N/A', 'threats': 'N/A'}
-        }
+        return None, str(e)
+
+def detach_uploads(files):
+    """Take ownership of upload streams so they outlive the request while the response streams."""
+    uploads = []
+    for file in files:
+        uploads.append((file.filename, file.stream))
+        # Flask closes request files once the view returns; leave it an empty stream to close instead
+        file.stream = io.BytesIO()
+    return uploads
+
+def extract_pdf_texts(datas):
+    """Extract (text, error) for many PDFs, serving repeats from the text cache and the rest from the process pool."""
+    keys = [hashlib.sha256(data).hexdigest() for data in datas]
+    results = [(pdf_text_cache.get(key), None) for key in keys]
+    missing = [i for i, (text, _) in enumerate(results) if text is None]
+    try:
+        extracted = run_in_pdf_pool(lambda pool: list(pool.map(extract_pdf_text, [datas[i] for i in missing])))
+    except BrokenProcessPool:
+        # The same chunk crashed a fresh pool too; report it rather than failing the whole batch
+        extracted = [(None, 'PDF extraction process crashed')] * len(missing)
+    for i, (text, error) in zip(missing, extracted):
+        results[i] = (text, error)
+        if error is None:
+            pdf_text_cache.set(keys[i], text)
+    return results
+
+def iter_batch_documents(uploads):
+    """Yield (filename, bytes or None, error) for uploaded PDFs and PDFs inside zip archives, one at a time."""
+    count = 0
+    try:
+        for upload_name, stream in uploads:
+            if upload_name.lower().endswith('.zip'):
+                try:
+                    archive = zipfile.ZipFile(stream)
+                except (zipfile.BadZipFile, zlib.error, RuntimeError, OSError) as e:
+                    yield upload_name, None, str(e)
+                    continue
+                members = [(info.filename, info) for info in archive.infolist()
+                           if not info.is_dir() and info.filename.lower().endswith('.pdf')
+                           and not info.filename.startswith('__MACOSX/')]
+            elif upload_name.lower().endswith('.pdf'):
+                archive = None
+                members = [(upload_name, None)]
+            else:
+                yield upload_name, None, 'Invalid file type'
+                continue
+            for filename, info in members:
+                count += 1
+                if count > BATCH_MAX_FILES:
+                    yield filename, None, f'Batch limit of {BATCH_MAX_FILES} files exceeded'
+                    return
+                if info and info.file_size > PDF_MAX_BYTES:
+                    yield filename, None, 'File too large'
+                    continue
+                try:
+                    data = archive.read(info) if info else stream.read(PDF_MAX_BYTES + 1)
+                except (zipfile.BadZipFile, zlib.error, RuntimeError, OSError) as e:
+                    # Corrupt or encrypted members are reported like any other bad file
+                    yield filename, None, str(e)
+                    continue
+                if len(data) > PDF_MAX_BYTES:
+                    yield filename, None, 'File too large'
+                    continue
+                yield filename, data, None
+    finally:
+        for _, stream in uploads:
+            stream.close()
+
+def rank_resumes(documents, job_keywords, scoring='overlap'):
+    """Score documents chunk by chunk and yield NDJSON lines: progress while scoring, then the ranking.
+
+    With scoring='tfidf' only keyword sets and structure scores are kept per resume, and the
+    whole pool is scored in one TfidfScorer pass once IDF weights can be learned from it.
+    """
+    ranked = []
+    pool = []
+    processed = 0
+    while chunk := list(islice(documents, BATCH_CHUNK_SIZE)):
+        readable = [(name, data) for name, data, error in chunk if error is None]
+        texts = extract_pdf_texts([data for _, data in readable])
+        errors = [(name, error) for name, _, error in chunk if error is not None]
+        errors += [(name, error) for (name, _), (_, error) in zip(readable, texts) if error is not None]
+        parsed = [(name, text) for (name, _), (text, error) in zip(readable, texts) if error is None]
+        del chunk, readable
+        for (name, text), resume_keywords in zip(parsed, extract_keywords_batch(text for _, text in parsed)):
+            matched_keywords = resume_keywords & job_keywords
+            item = {
+                'filename': name,
+                'score': calculate_resume_score(text, matched_keywords, job_keywords),
+                'matched': sorted(matched_keywords),
+                'missing_count': len(job_keywords - resume_keywords)
+            }
+            if scoring == 'tfidf':
+                pool.append((item, resume_keywords, structure_score(text)))
+            ranked.append(item)
+        ranked.extend({'filename': name, 'score': None, 'error': error} for name, error in errors)
+        processed += len(parsed) + len(errors)
+        yield json.dumps({'type': 'progress', 'processed': processed}) + '\n'
+    if pool:
+        items, keyword_sets, structure_scores = zip(*pool)
+        scorer = TfidfScorer().fit(keyword_sets + (job_keywords,))
+        for item, score in zip(items, scorer.score_matrix(keyword_sets, [job_keywords], structure_scores)[:, 0]):
+            item['score'] = int(score)
+    ranked.sort(key=lambda item: (item['score'] is None, -(item['score'] or 0), item['filename']))
+    for rank, item in enumerate(ranked, start=1):
+        yield json.dumps({'type': 'result', 'rank': rank, **item}) + '\n'
+
+# Registered job descriptions, analysed once and reused for every candidate
+JOB_PROFILE_DB = os.getenv('JOB_PROFILE_DB', os.path.join('data', 'job_profiles.sqlite3'))
+
+def _profile_db():
+    os.makedirs(os.path.dirname(JOB_PROFILE_DB) or '.', exist_ok=True)
+    conn = sqlite3.connect(JOB_PROFILE_DB, timeout=5)
+    conn.row_factory = sqlite3.Row
+    conn.execute('CREATE TABLE IF NOT EXISTS job_profiles (id TEXT PRIMARY KEY, fingerprint TEXT UNIQUE NOT NULL, '
+                 'job_description TEXT NOT NULL, keywords TEXT NOT NULL, domain TEXT NOT NULL, created_at REAL NOT NULL)')
+    return conn
+
+class DomainUnavailableError(RuntimeError):
+    """Raised when a profile's job domain cannot be detected."""
+
+def job_fingerprint(job_description):
+    """Hash the job description after lowercasing and collapsing whitespace."""
+    return hashlib.sha256(' '.join(job_description.lower().split()).encode('utf-8')).hexdigest()
+
+def _profile_from_row(row):
+    return {
+        'id': row['id'],
+        'fingerprint': row['fingerprint'],
+        'job_description': row['job_description'],
+        'keywords': set(json.loads(row['keywords'])),
+        'domain': row['domain']
+    }
+
+def get_job_profile(profile_id):
+    """Load a registered job profile by ID, or None if it does not exist."""
+    with _profile_db() as conn:
+        row = conn.execute('SELECT * FROM job_profiles WHERE id = ?', (profile_id,)).fetchone()
+    return _profile_from_row(row) if row else None
+
+def register_job_profile(job_description):
+    """Store keywords and domain for a job description; returns (profile, created).
+
+    Raises DomainUnavailableError and stores nothing when Gemini fails, so a failed
+    domain lookup is never saved as the profile's permanent domain.
+    """
+    fingerprint = job_fingerprint(job_description)
+    with _profile_db() as conn:
+        row = conn.execute('SELECT * FROM job_profiles WHERE fingerprint = ?', (fingerprint,)).fetchone()
+    if row:
+        return _profile_from_row(row), False
+    profile = {
+        'id': fingerprint[:16],
+        'fingerprint': fingerprint,
+        'job_description': job_description,
+        'keywords': extract_keywords(job_description),
+        'domain': None
+    }
+    try:
+        profile['domain'] = query_job_domain(job_description)
+    except Exception as e:
+        raise DomainUnavailableError(str(e)) from e
+    with _profile_db() as conn:
+        conn.execute('INSERT OR IGNORE INTO job_profiles (id, fingerprint, job_description, keywords, domain, created_at) '
+                     'VALUES (?, ?, ?, ?, ?, ?)',
+                     (profile['id'], fingerprint, job_description, json.dumps(sorted(profile['keywords'])),
+                      profile['domain'], time.time()))
+    return profile, True
+
+def profile_json(profile):
+    return {
+        'profile_id': profile['id'],
+        'fingerprint': profile['fingerprint'],
+        'domain': profile['domain'],
+        'keywords': sorted(profile['keywords'])
+    }
+
+def parse_upload_request():
+    """Validate an /upload-style form; returns ((file, job_description, profile), None) or (None, error response)."""
+    profile_id = request.form.get('profile_id', '').strip()
+    if 'resume' not in request.files or not (profile_id or 'job_description' in request.form):
+        return None, ('Missing resume or job description', 400)
+    profile = get_job_profile(profile_id) if profile_id else None
+    if profile_id and profile is None:
+        return None, ('Unknown job profile', 404)
+    file = request.files['resume']
+    job_description = profile['job_description'] if profile else request.form['job_description']
+    if file.filename == '' or not job_description.strip():
+        return None, ('No file selected or empty job description', 400)
+    if not file.filename.endswith('.pdf'):
+        return None, ('Invalid file type', 400)
+    return (file, job_description, profile), None
+
+def analyze_resume(data, job_description, profile=None, progress=None, stream_suggestions=False):
+    """Run the full analysis for one PDF and return the result.html context; progress(stage) reports each step.
+
+    With stream_suggestions the suggestions are a StreamedSuggestions read lazily while rendering.
+    """
+    progress = progress or (lambda stage: None)
+    progress('pdf')
+    with stage_timer('pdf'):
+        resume_text = pdf_to_text(data)
+    # Domain and details only need the raw text, so they run while spaCy works
+    combined_future = domain_future = None
+    if GEMINI_COMBINED_CALL and not profile:
+        combined_future = submit_stage('combined', extract_details_and_domain, resume_text, job_description)
+        details_future = None
+    else:
+        domain_future = None if profile else submit_stage('domain', detect_job_domain, job_description)
+        details_future = submit_stage('details', extract_resume_details, resume_text)
+    progress('keywords')
+    with stage_timer('keywords'):
+        resume_keywords = extract_keywords(resume_text)
+        job_keywords = profile['keywords'] if profile else extract_keywords(job_description)
+    with stage_timer('score'):
+        matched_keywords = resume_keywords.intersection(job_keywords)
+        missing_keywords = job_keywords - resume_keywords
+        resume_score = calculate_resume_score(resume_text, matched_keywords, job_keywords)
+    progress('details')
+    if combined_future:
+        details, domain = await_stage(combined_future, lambda: (extract_contact_details(resume_text), default_domain()))
+    else:
+        domain = profile['domain'] if profile else await_stage(domain_future, default_domain)
+        details = await_stage(details_future, lambda: extract_contact_details(resume_text))
+    progress('suggestions')
+    if stream_suggestions:
+        suggestions = StreamedSuggestions(missing_keywords, job_description, domain, details.get('name'))
+    else:
+        suggestions_future = submit_stage('suggestions', generate_suggestions,
+                                          missing_keywords, job_description, domain, details.get('name'))
+        suggestions = await_stage(suggestions_future, default_suggestions)
+    logging.debug(f"Scored resume: score={resume_score}, domain={domain}, "
+                  f"matched={len(matched_keywords)}, missing={len(missing_keywords)}")
+    return {
+        'matched': list(matched_keywords),
+        'missing': list(missing_keywords),
+        'details': details,
+        'suggestions': suggestions,
+        'resume_score': resume_score,
+        'matched_json': json.dumps(list(matched_keywords)),
+        'missing_json': json.dumps(list(missing_keywords)),
+        'domain': domain
+    }
+
+# Asynchronous analysis jobs: a bounded in-process queue drained by worker threads,
+# with job state in SQLite so any gunicorn worker can answer status and event requests
+JOB_DB = os.getenv('JOB_DB', os.path.join('cache', 'jobs.sqlite3'))
+JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', '16'))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_TTL = int(os.getenv('JOB_TTL', '3600'))
+JOB_RETRY_AFTER = int(os.getenv('JOB_RETRY_AFTER', '5'))
+# Event streams close before gunicorn's default 30s worker timeout; clients reconnect
+JOB_STREAM_TIMEOUT = float(os.getenv('JOB_STREAM_TIMEOUT', '25'))
+JOB_HEARTBEAT_INTERVAL = 5
+JOB_POLL_INTERVAL = 0.5
+# A live job is updated at least once per stage, so rows quiet for longer than the
+# slowest stage deadline belong to a worker that died and are marked failed
+JOB_STALE_AFTER = float(os.getenv('JOB_STALE_AFTER', str(max(STAGE_TIMEOUTS.values()) + 15)))
+_job_queue = queue.Queue(maxsize=JOB_QUEUE_SIZE)
+_job_threads = []
+_job_threads_lock = threading.Lock()
+
+def _job_db():
+    os.makedirs(os.path.dirname(JOB_DB) or '.', exist_ok=True)
+    conn = sqlite3.connect(JOB_DB, timeout=5)
+    conn.row_factory = sqlite3.Row
+    conn.execute('CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, stage TEXT, '
+                 'result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)')
+    return conn
+
+def get_job(job_id):
+    with _job_db() as conn:
+        fail_stale_jobs(conn)
+        row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    return dict(row) if row else None
+
+def update_job(job_id, **fields):
+    assignments = ', '.join(f'{name} = ?' for name in fields)
+    now = time.time()
+    with _job_db() as conn:
+        conn.execute(f'UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ?', (*fields.values(), now, job_id))
+        # Jobs still waiting in this process's queue are alive too; keep them from looking stale
+        with _job_queue.mutex:
+            queued_ids = [item[0] for item in _job_queue.queue]
+        if queued_ids:
+            conn.execute(f"UPDATE jobs SET updated_at = ? WHERE status = 'queued' "
+                         f"AND id IN ({', '.join('?' * len(queued_ids))})", (now, *queued_ids))
+
+def fail_stale_jobs(conn):
+    """Mark queued or running jobs not updated within JOB_STALE_AFTER as failed (their worker is gone)."""
+    conn.execute("UPDATE jobs SET status = 'failed', error = ?, updated_at = ? "
+                 "WHERE status IN ('queued', 'running') AND updated_at < ?",
+                 ('The worker running this job stopped before it finished', time.time(),
+                  time.time() - JOB_STALE_AFTER))
+
+def job_json(job):
+    return {'job_id': job['id'], 'status': job['status'], 'stage': job['stage'], 'error': job['error']}
+
+def enqueue_job(data, job_description, profile=None):
+    """Record a queued job and hand it to the worker threads; raises queue.Full when the queue is at capacity."""
+    start_job_workers()
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with _job_db() as conn:
+        conn.execute('DELETE FROM jobs WHERE updated_at < ?', (now - JOB_TTL,))
+        conn.execute('INSERT INTO jobs (id, status, stage, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+                     (job_id, 'queued', None, now, now))
+    try:
+        _job_queue.put_nowait((job_id, data, job_description, profile))
+    except queue.Full:
+        with _job_db() as conn:
+            conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+        raise
+    return job_id
+
+def start_job_workers():
+    """Start the job threads on first use so they run in the gunicorn worker, not the preloading master."""
+    with _job_threads_lock:
+        if not _job_threads:
+            with _job_db() as conn:
+                fail_stale_jobs(conn)
+        while len(_job_threads) < JOB_WORKERS:
+            thread = threading.Thread(target=job_worker, name=f'job-{len(_job_threads)}', daemon=True)
+            thread.start()
+            _job_threads.append(thread)
+
+def job_worker():
+    while True:
+        job_id, data, job_description, profile = _job_queue.get()
+        try:
+            update_job(job_id, status='running')
+            result = analyze_resume(data, job_description, profile, progress=lambda stage: update_job(job_id, stage=stage))
+            update_job(job_id, status='done', stage='done', result=json.dumps(result))
+        except Exception as e:
+            logging.error(f"Job {job_id} error: {str(e)}")
+            update_job(job_id, status='failed', error=str(e))
+        finally:
+            _job_queue.task_done()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.endpoint or 'unknown'
+    if 'request_started' in g:
+        started = g.request_started
+        observe = lambda: REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint)
+        # Streamed bodies (NDJSON, SSE, streamed results) are timed until the last chunk is sent
+        if response.is_streamed:
+            response.call_on_close(observe)
+        else:
+            observe()
+    REQUESTS.inc(endpoint, response.status_code)
+    return response
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of this worker's counters and histograms."""
+    lines = []
+    for metric in (REQUESTS, REQUEST_SECONDS, STAGE_SECONDS, STAGE_FALLBACKS):
+        lines.extend(metric.render())
+    lines.append('# HELP resume_analyzer_cache_requests_total Cache lookups by cache and result.')
+    lines.append('# TYPE resume_analyzer_cache_requests_total counter')
+    for cache_name, cache in (('llm', llm_cache), ('pdf_text', pdf_text_cache)):
+        for result_name, value in sorted(cache.stats.items()):
+            lines.append(f'resume_analyzer_cache_requests_total{{cache="{cache_name}",result="{result_name}"}} {value}')
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
 
 @app.route('/')
 def home():
@@ -204,42 +1245,143 @@ def home():
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    if 'resume' not in request.files or 'job_description' not in request.form:
-        return 'Missing resume or job description', 400
-    file = request.files['resume']
-    job_description = request.form['job_description']
-    if file.filename == '' or not job_description.strip():
-        return 'No file selected or empty job description', 400
-    if file and file.filename.endswith('.pdf'):
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        file.save(filepath)
-        try:
-            reader = PdfReader(filepath)
-            resume_text = ''.join(page.extract_text() or '' for page in reader.pages)
-            resume_keywords = extract_keywords(resume_text)
-            job_keywords = extract_keywords(job_description)
-            matched_keywords = resume_keywords.intersection(job_keywords)
-            missing_keywords = job_keywords - resume_keywords
-            resume_score = calculate_resume_score(resume_text, matched_keywords, job_keywords)
-            domain = detect_job_domain(job_description)
-            details = extract_resume_details(resume_text)
-            suggestions = generate_suggestions(missing_keywords, job_description, domain, details.get('name'))
-            result = {
-                'matched': list(matched_keywords),
-                'missing': list(missing_keywords),
-                'details': details,
-                'suggestions': suggestions,
-                'resume_score': resume_score,
-                'matched_json': json.dumps(list(matched_keywords)),
-                'missing_json': json.dumps(list(missing_keywords)),
-                'domain': domain
-            }
-            logging.debug(f"Result: {result}")
+    upload, error = parse_upload_request()
+    if error:
+        return error
+    file, job_description, profile = upload
+    try:
+        result = analyze_resume(read_upload(file), job_description, profile,
+                                stream_suggestions=GEMINI_STREAM_SUGGESTIONS)
+        if GEMINI_STREAM_SUGGESTIONS:
+            # Chunked response: everything above the AI analysis is sent before Gemini finishes
+            started = time.perf_counter()
+            response = Response(stream_template('result.html', result=result))
+            response.call_on_close(lambda: record_stage('render', time.perf_counter() - started))
+            return response
+        with stage_timer('render'):
             return render_template('result.html', result=result)
-        except Exception as e:
-            logging.error(f"PDF error: {str(e)}")
-            return f'Error processing PDF: {str(e)}', 500
-    return 'Invalid file type', 400
+    except PDFLimitError as e:
+        return f'Error processing PDF: {str(e)}', 413
+    except Exception as e:
+        logging.error(f"PDF error: {str(e)}")
+        return f'Error processing PDF: {str(e)}', 500
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """Queue an /upload-style analysis and return its job ID immediately."""
+    upload, error = parse_upload_request()
+    if error:
+        return error
+    file, job_description, profile = upload
+    try:
+        job_id = enqueue_job(read_upload(file), job_description, profile)
+    except PDFLimitError as e:
+        return f'Error processing PDF: {str(e)}', 413
+    except queue.Full:
+        return 'Too many queued analyses, try again shortly', 429, {'Retry-After': str(JOB_RETRY_AFTER)}
+    return jsonify(job_id=job_id, status='queued', status_url=f'/jobs/{job_id}',
+                   events_url=f'/jobs/{job_id}/events', result_url=f'/jobs/{job_id}/result'), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return 'Unknown job', 404
+    return jsonify(job_json(job))
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-sent events with the job's stage until it finishes or JOB_STREAM_TIMEOUT passes."""
+    if get_job(job_id) is None:
+        return 'Unknown job', 404
+
+    def stream():
+        last = None
+        last_sent = time.monotonic()
+        deadline = last_sent + JOB_STREAM_TIMEOUT
+        while time.monotonic() < deadline:
+            job = get_job(job_id)
+            if job is None:
+                return
+            state = job_json(job)
+            if state != last:
+                event = 'progress' if job['status'] in ('queued', 'running') else job['status']
+                yield f"event: {event}\ndata: {json.dumps(state)}\n\n"
+                last = state
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= JOB_HEARTBEAT_INTERVAL:
+                yield ': keep-alive\n\n'
+                last_sent = time.monotonic()
+            if job['status'] in ('done', 'failed'):
+                return
+            time.sleep(JOB_POLL_INTERVAL)
+        # EventSource clients reconnect on their own after the stream ends
+        yield 'event: timeout\ndata: {}\n\n'
+
+    return Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return 'Unknown job', 404
+    if job['status'] == 'failed':
+        return f"Error processing PDF: {job['error']}", 500
+    if job['status'] != 'done':
+        return jsonify(job_json(job)), 202
+    with stage_timer('render'):
+        return render_template('result.html', result=json.loads(job['result']))
+
+@app.before_request
+def raise_batch_body_limit():
+    if request.endpoint == 'batch_rank':
+        request.max_content_length = BATCH_MAX_BYTES + FORM_OVERHEAD_BYTES
+
+@app.route('/batch', methods=['POST'])
+def batch_rank():
+    """Rank many resumes (PDFs and/or zip archives) against one job description as NDJSON."""
+    files = request.files.getlist('resumes')
+    profile_id = request.form.get('profile_id', '').strip()
+    job_description = request.form.get('job_description', '')
+    if not files or not (profile_id or job_description.strip()):
+        return 'Missing resumes or job description', 400
+    if profile_id:
+        profile = get_job_profile(profile_id)
+        if profile is None:
+            return 'Unknown job profile', 404
+        job_keywords = profile['keywords']
+    else:
+        job_keywords = extract_keywords(job_description)
+    scoring = request.form.get('scoring', 'overlap')
+    if scoring not in ('overlap', 'tfidf'):
+        return 'Invalid scoring mode', 400
+    lines = rank_resumes(iter_batch_documents(detach_uploads(files)), job_keywords, scoring)
+    return Response(lines, mimetype='application/x-ndjson')
+
+@app.route('/profiles', methods=['POST'])
+def create_profile():
+    """Register a job description once; later uploads pass the returned profile_id instead of the text."""
+    data = request.get_json(silent=True) or request.form
+    if not isinstance(data, dict):
+        return 'Expected a JSON object', 400
+    job_description = data.get('job_description', '')
+    if not isinstance(job_description, str):
+        return 'job_description must be a string', 400
+    if not job_description.strip():
+        return 'Missing job description', 400
+    try:
+        profile, created = register_job_profile(job_description)
+    except DomainUnavailableError as e:
+        logging.error(f"Gemini domain error while registering profile: {str(e)}")
+        return 'Job domain detection is unavailable, try again shortly', 503
+    return jsonify(profile_json(profile)), 201 if created else 200
+
+@app.route('/profiles/<profile_id>')
+def show_profile(profile_id):
+    profile = get_job_profile(profile_id)
+    if profile is None:
+        return 'Unknown job profile', 404
+    return jsonify(profile_json(profile))
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""Offline latency benchmark for the /upload pipeline.
+
+Drives /upload through Flask's test client with synthetic PDFs and the fake
+Gemini backend (no network), collects every stage_timer observation and reports
+p50/p95/max per stage. Response caches are disabled so every request does the
+full amount of work.
+
+Usage:
+    python benchmarks/pipeline.py [--requests 50] [--pages 2] [--latency 0.2]
+    python benchmarks/pipeline.py --save baseline.json
+    python benchmarks/pipeline.py --compare baseline.json [--tolerance 0.25]
+
+With --compare the script exits non-zero when any stage's p95 is more than
+--tolerance slower than the baseline.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = (
+    "python sql aws docker kubernetes flask django react analytics pipeline leadership agile "
+    "experience education skills project team customer finance healthcare design testing cloud "
+    "architecture security api migration reporting stakeholder mentoring automation research"
+).split()
+
+JOB_DESCRIPTION = (
+    "We are hiring a backend software engineer with strong Python, SQL and AWS experience. "
+    "You will design APIs, build data pipelines, automate testing and mentor a small agile team. "
+    "Docker, Kubernetes and cloud security experience are a plus."
+)
+
+def make_pdf(pages):
+    """Build a minimal single-font PDF with one text page per entry in pages."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = ' '.join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    font_id = 3 + 2 * len(pages)
+    for i, text in enumerate(pages):
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * i} 0 R >>".encode())
+        lines = ''.join(f"({line}) Tj 0 -12 Td " for line in text.split('\n'))
+        stream = f"BT /F1 9 Tf 40 760 Td {lines}ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b''.join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+def synthetic_resume(rng, pages):
+    """A resume PDF with a header, contact details and ~60 lines of random keywords per page."""
+    header = "Jane Candidate\njane.candidate@example.com 555-123-4567\nSkills Experience Education"
+    bodies = ['\n'.join(' '.join(rng.choices(WORDS, k=10)) for _ in range(60)) for _ in range(pages)]
+    bodies[0] = header + '\n' + bodies[0]
+    return make_pdf(bodies)
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+def run(args):
+    os.environ.update({
+        'GEMINI_BACKEND': 'fake',
+        'FAKE_GEMINI_LATENCY': str(args.latency),
+        'LLM_CACHE_PATH': '',
+        'PDF_TEXT_CACHE_PATH': '',
+        'LLM_CACHE_SIZE': '0',
+        'LOG_LEVEL': 'WARNING',
+    })
+    sys.path.insert(0, ROOT)
+    import app
+
+    samples = defaultdict(list)
+    app.STAGE_LISTENERS.append(lambda stage, seconds: samples[stage].append(seconds))
+    client = app.app.test_client()
+    rng = random.Random(args.seed)
+    resumes = [synthetic_resume(rng, args.pages) for _ in range(min(args.requests, 20))]
+
+    client.post('/upload', data={'job_description': JOB_DESCRIPTION,
+                                 'resume': (io.BytesIO(resumes[0]), 'warmup.pdf')})
+    samples.clear()
+    for i in range(args.requests):
+        started = time.perf_counter()
+        response = client.post('/upload', data={'job_description': JOB_DESCRIPTION,
+                                                'resume': (io.BytesIO(resumes[i % len(resumes)]), f'{i}.pdf')})
+        samples['request'].append(time.perf_counter() - started)
+        if response.status_code != 200:
+            sys.exit(f"Request {i} failed with {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+    return {stage: {'p50': percentile(values, 0.5), 'p95': percentile(values, 0.95), 'max': max(values),
+                    'n': len(values)}
+            for stage, values in samples.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--pages', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds each fake Gemini call sleeps')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file written by --save')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = run(args)
+    print(f"{'stage':<22}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for stage, stats in sorted(results.items()):
+        print(f"{stage:<22}{stats['n']:>6}{stats['p50'] * 1000:>10.1f}{stats['p95'] * 1000:>10.1f}"
+              f"{stats['max'] * 1000:>10.1f}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = [f"{stage}: p95 {results[stage]['p95'] * 1000:.1f} ms vs {stats['p95'] * 1000:.1f} ms"
+                       for stage, stats in baseline.items()
+                       if stage in results and results[stage]['p95'] > stats['p95'] * (1 + args.tolerance)]
+        if regressions:
+            sys.exit('Regressions:\n' + '\n'.join(regressions))
+        print(f"No stage regressed by more than {args.tolerance:.0%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Cold-start and per-worker memory benchmark for the SpaCy pipeline.
+
+Each scenario runs in a fresh interpreter that imports app.py and then forks
+worker processes the way gunicorn does. Every worker runs extract_keywords once
+and reports its cold-start time and memory from /proc/self/smaps_rollup.
+
+Scenarios:
+    full     - whole pipeline (nothing excluded), loaded in every worker
+    slim     - trimmed pipeline (SPACY_EXCLUDE default), loaded in every worker
+    preload  - trimmed pipeline loaded once in the master (NLP_PRELOAD=1, gunicorn --preload)
+
+Usage:
+    python benchmarks/startup.py [--workers 4] [--scenarios full,slim,preload]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    'full': {'SPACY_EXCLUDE': '', 'NLP_PRELOAD': '0'},
+    'slim': {'NLP_PRELOAD': '0'},
+    'preload': {'NLP_PRELOAD': '1'},
+}
+
+SAMPLE_TEXT = (
+    "Senior Python developer with seven years of experience building data pipelines on AWS at Acme Corp. "
+    "Skills: Python, SQL, Docker, Kubernetes, Flask. Education: BSc Computer Science, University of Toronto."
+)
+
+def memory_usage():
+    """Return RSS, PSS and private memory of this process in MiB."""
+    usage = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty'):
+                    usage[key] = int(value.split()[0]) / 1024
+    except OSError:
+        import resource
+        usage['Rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        'rss_mib': round(usage.get('Rss', 0), 1),
+        'pss_mib': round(usage.get('Pss', 0), 1),
+        'private_mib': round(usage.get('Private_Clean', 0) + usage.get('Private_Dirty', 0), 1),
+    }
+
+def run_scenario(workers):
+    """Import the app, fork workers and report per-worker numbers as JSON (runs in a child interpreter)."""
+    sys.path.insert(0, ROOT)
+    started = time.perf_counter()
+    import app
+    import_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    app.app.test_client().get('/')
+    home_seconds = time.perf_counter() - started
+
+    results = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            started = time.perf_counter()
+            app.extract_keywords(SAMPLE_TEXT)
+            report = {'first_keywords_s': round(time.perf_counter() - started, 3), **memory_usage()}
+            with os.fdopen(write_fd, 'w') as f:
+                json.dump(report, f)
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as f:
+            results.append(json.load(f))
+        os.waitpid(pid, 0)
+
+    print(json.dumps({
+        'import_s': round(import_seconds, 3),
+        'home_first_request_s': round(home_seconds, 3),
+        'pipeline': app.get_nlp().pipe_names,
+        'workers': results,
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--run-scenario', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_scenario:
+        run_scenario(args.workers)
+        return
+
+    print(f"{'scenario':<10}{'import s':>10}{'GET / s':>10}{'worker s':>10}{'RSS MiB':>10}{'PSS MiB':>10}{'private MiB':>13}  pipeline")
+    for name in args.scenarios.split(','):
+        env = {**os.environ, 'GEMINI_BACKEND': 'fake', 'LLM_CACHE_PATH': '', 'PDF_TEXT_CACHE_PATH': '',
+               **SCENARIOS[name]}
+        proc = subprocess.run([sys.executable, __file__, '--run-scenario', '--workers', str(args.workers)],
+                              env=env, cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            sys.exit(f"Scenario '{name}' failed:\n{proc.stderr}")
+        report = json.loads(proc.stdout.strip().splitlines()[-1])
+        workers = report['workers']
+        average = {key: sum(w[key] for w in workers) / len(workers) for key in workers[0]}
+        print(f"{name:<10}{report['import_s']:>10.3f}{report['home_first_request_s']:>10.3f}"
+              f"{average['first_keywords_s']:>10.3f}{average['rss_mib']:>10.1f}{average['pss_mib']:>10.1f}"
+              f"{average['private_mib']:>13.1f}  {','.join(report['pipeline'])}")
+
+if __name__ == '__main__':
+    main()